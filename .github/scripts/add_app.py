@@ -4,7 +4,27 @@ import sys
 import argparse
 from utils import load_json, save_json, validate_repo_format, validate_url, logger, GitHubClient, normalize_name
 
-def process_single_app(app_data, client=None):
+STANDARD_PATH = 'sources/standard/apps.json'
+NSFW_PATH = 'sources/nsfw/apps.json'
+
+def app_key(repo, name):
+    """Case-insensitive (repo, name) key identifying an apps.json entry."""
+    return (repo.lower(), name.lower())
+
+def load_catalog(path):
+    """Load an apps.json list together with an index of its entries by app_key."""
+    data = load_json(path)
+    index = {app_key(a.get('github_repo', ''), a.get('name', '')): a for a in data}
+    return {'path': path, 'data': data, 'index': index, 'dirty': False}
+
+def save_catalogs(catalogs):
+    """Write back only the apps.json files that were modified."""
+    for catalog in catalogs.values():
+        if catalog['dirty']:
+            save_json(catalog['path'], catalog['data'])
+            catalog['dirty'] = False
+
+def process_single_app(app_data, client=None, catalogs=None):
     """Process a single app dictionary. Returns result dict."""
     app_name = (app_data.get('name') or '').strip()
     repo_input = (app_data.get('repo') or '').strip()
@@ -30,29 +50,27 @@ def process_single_app(app_data, client=None):
     # Sanitize App Name
     app_name = ''.join(c for c in app_name if c.isprintable())
     
-    # Paths
-    standard_path = 'sources/standard/apps.json'
-    nsfw_path = 'sources/nsfw/apps.json'
+    # Catalogs (loaded once and saved once per batch by main)
+    standalone = catalogs is None
+    if standalone:
+        catalogs = {path: load_catalog(path) for path in (STANDARD_PATH, NSFW_PATH)}
     
-    target_path = standard_path if category == 'Standard' else nsfw_path
-    other_path = nsfw_path if category == 'Standard' else standard_path
+    target = catalogs[STANDARD_PATH if category == 'Standard' else NSFW_PATH]
+    other = catalogs[NSFW_PATH if category == 'Standard' else STANDARD_PATH]
+    target_path = target['path']
+    data = target['data']
 
     # Check/Move from other list
-    if os.path.exists(other_path):
-        other_data = load_json(other_path)
-        new_other_data = [app for app in other_data if app.get('github_repo', '').lower() != repo.lower()]
-        if len(new_other_data) < len(other_data):
-            logger.info(f"Moving {repo} from {other_path} to {target_path}...")
-            save_json(other_path, new_other_data)
-
-    # Load Target
-    data = load_json(target_path)
+    repo_lower = repo.lower()
+    if any(r == repo_lower for r, _ in other['index']):
+        logger.info(f"Moving {repo} from {other['path']} to {target_path}...")
+        other['data'][:] = [app for app in other['data'] if app.get('github_repo', '').lower() != repo_lower]
+        other['index'] = {k: v for k, v in other['index'].items() if k[0] != repo_lower}
+        other['dirty'] = True
     
     # Check if exists
     # Matching strategy: Same repo AND same name to support flavors/versions
-    existing_entry = next((item for item in data 
-                          if item.get('github_repo', '').lower() == repo.lower() 
-                          and item.get('name', '').lower() == app_name.lower()), None)
+    existing_entry = target['index'].get(app_key(repo, app_name))
     
     status = ""
     message = ""
@@ -135,10 +153,13 @@ def process_single_app(app_data, client=None):
             logger.info(f"Set icon_url to {icon_url}")
             
         data.append(new_entry)
+        target['index'][app_key(repo, app_name)] = new_entry
         status = "added"
         message = f"Added to {category}"
 
-    save_json(target_path, data)
+    target['dirty'] = True
+    if standalone:
+        save_catalogs(catalogs)
     return {'status': status, 'message': message, 'repo': repo}
 
 def main():
@@ -155,7 +176,7 @@ def main():
             
         logger.info(f"Processing removal for: {repo}")
         removed = False
-        paths = ['sources/standard/apps.json', 'sources/nsfw/apps.json']
+        paths = [STANDARD_PATH, NSFW_PATH]
         
         for path in paths:
             if not os.path.exists(path): continue
@@ -185,17 +206,21 @@ def main():
         sys.exit(0)
 
     # Initialize GitHub Client if token is available
-    client = GitHubClient() if os.environ.get('GITHUB_TOKEN') else None
+    client = GitHubClient.instance() if os.environ.get('GITHUB_TOKEN') else None
+
+    catalogs = {path: load_catalog(path) for path in (STANDARD_PATH, NSFW_PATH)}
 
     results = []
     for app_data in apps_list:
         try:
-            res = process_single_app(app_data, client)
+            res = process_single_app(app_data, client, catalogs)
             results.append(res)
         except Exception as e:
             logger.error(f"Error processing {app_data}: {e}")
             results.append({'status': 'error', 'message': str(e), 'repo': app_data.get('repo', 'unknown')})
 
+    save_catalogs(catalogs)
+
     # Output results for comment
     with open(os.environ['GITHUB_OUTPUT'], 'a') as fh:
         fh.write(f'results={json.dumps(results)}\n')
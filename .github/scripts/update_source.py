@@ -5,12 +5,31 @@ import hashlib
 import tempfile
 import shutil
 import re
+import functools
+from collections import namedtuple
 from datetime import datetime
+import numpy as np
 from PIL import Image
 from io import BytesIO
 
 from utils import load_json, save_json, logger, GitHubClient, find_best_icon, score_icon_path, normalize_name, GLOBAL_CONFIG
 
+# Apps are processed concurrently; the work is dominated by GitHub API and CDN round-trips.
+# Conditional API requests keep the extra workers from burning through the rate limit.
+MAX_WORKERS = 8
+
+INFO_PLIST_PATTERN = re.compile(r'^Payload/[^/]+\.app/Info\.plist$', re.IGNORECASE)
+REDUNDANT_NIGHTLY_PATTERN = re.compile(r'^(.+)-nightly\.\1$')
+NIGHTLY_SUFFIX_PATTERN = re.compile(r'^v?\d+(\.\d+)*\.nightly$')
+NON_ALNUM_PATTERN = re.compile(r'[^a-z0-9]')
+WORD_PATTERN = re.compile(r'[a-z0-9]{2,}')
+BRACKET_TAG_PATTERN = re.compile(r'\((.*?)\)')
+
+@functools.lru_cache(maxsize=64)
+def compile_user_regex(pattern):
+    """Compile a user-supplied regex from apps.json once per distinct pattern."""
+    return re.compile(pattern, re.IGNORECASE)
+
 def is_meaningless_version(version_str):
     """Check if a version string is redundant or meaningless."""
     if not version_str: return True
@@ -22,12 +41,12 @@ def is_meaningless_version(version_str):
     
     # 2. Redundant patterns like "1.0-nightly.1.0" or "3.6.60-nightly.3.6.60"
     # Matches <ver>-nightly.<ver>
-    match = re.search(r'^(.+)-nightly\.\1$', v)
+    match = REDUNDANT_NIGHTLY_PATTERN.search(v)
     if match:
         return True
         
     # Matches <ver>.nightly
-    if re.search(r'^v?\d+(\.\d+)*\.nightly$', v):
+    if NIGHTLY_SUFFIX_PATTERN.search(v):
         return True
 
     return False
@@ -80,18 +99,30 @@ def deduplicate_versions(versions, app_name):
     final_list.sort(key=lambda x: x.get('date', ''), reverse=True)
     return final_list
 
+def find_info_plist(ipa):
+    """Locate Payload/<App>.app/Info.plist inside an opened IPA."""
+    # Fast path: derive the .app directory from the first Payload entry and probe the name index
+    for name in ipa.NameToInfo:
+        app_dir, sep, _ = name[8:].partition('/') if name.startswith('Payload/') else ('', '', '')
+        if sep and app_dir.lower().endswith('.app'):
+            candidate = f"Payload/{app_dir}/Info.plist"
+            if candidate in ipa.NameToInfo:
+                return candidate
+            break
+
+    # Slow path: unusual casing or layout
+    for info in ipa.infolist():
+        name = info.filename
+        # Cheap suffix check first; IPAs can hold thousands of entries
+        if name[-11:].lower() == '/info.plist' and INFO_PLIST_PATTERN.match(name):
+            return name
+    return None
+
 def get_ipa_metadata(ipa_path, default_bundle_id):
     """Extract version, build number, and bundle ID from IPA content."""
     try:
         with zipfile.ZipFile(ipa_path, 'r') as ipa:
-            info_plist_path = None
-            pattern = re.compile(r'^Payload/[^/]+\.app/Info\.plist$', re.IGNORECASE)
-            
-            for name in ipa.namelist():
-                if pattern.match(name):
-                    info_plist_path = name
-                    break
-            
+            info_plist_path = find_info_plist(ipa)
             if not info_plist_path:
                 return None, None, None
 
@@ -109,9 +140,11 @@ def get_ipa_metadata(ipa_path, default_bundle_id):
 
 def get_ipa_sha256(ipa_path):
     """Calculate SHA256 hash of IPA file."""
-    sha256_hash = hashlib.sha256()
     with open(ipa_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
+        if hasattr(hashlib, 'file_digest'): # Python 3.11+
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        sha256_hash = hashlib.sha256()
+        for byte_block in iter(lambda: f.read(1 << 20), b""):
             sha256_hash.update(byte_block)
     return sha256_hash.hexdigest()
 
@@ -130,41 +163,30 @@ def package_app_to_ipa(app_path, output_ipa_path):
         logger.error(f"Failed to package IPA from {app_path}: {e}")
         return False
 
-def extract_dominant_color(image_url, client):
-    """Extract dominant color from image URL."""
-    if not image_url or not image_url.startswith(('http://', 'https://')):
-        return None
-
-    try:
-        response = client.get(image_url, timeout=10)
-        if not response: return None
-        
-        img = Image.open(BytesIO(response.content))
-        img = img.convert("RGBA")
-        img = img.resize((100, 100))
-        
-        colors = img.getcolors(10000)
-        if not colors:
-            return None
+IconMeta = namedtuple('IconMeta', ['quality', 'is_square', 'has_transparency'])
+EMPTY_ICON_META = IconMeta(0, False, False)
 
-        max_count = 0
-        dominant = (0, 0, 0)
-        
-        for count, color in colors:
-            if len(color) == 4 and color[3] < 10:
-                continue
-            r, g, b = color[:3]
-            if r > 240 and g > 240 and b > 240: continue # White
-            if r < 15 and g < 15 and b < 15: continue # Black
-            
-            if count > max_count:
-                max_count = count
-                dominant = color[:3]
-                
-        return '#{:02x}{:02x}{:02x}'.format(*dominant).upper()
-    except Exception as e:
-        logger.warning(f"Could not extract color from {image_url}: {e}")
-        return None
+def dominant_color_of(img):
+    """
+    Extract dominant color from a decoded image.
+    Pixels are bucketed at 4 bits per channel and the most populated bucket's mean is returned.
+    """
+    arr = np.asarray(img.convert("RGBA").resize((64, 64)))
+    rgb = arr[..., :3]
+    
+    mask = arr[..., 3] >= 10 # Transparent
+    mask &= ~(rgb > 240).all(axis=-1) # White
+    mask &= ~(rgb < 15).all(axis=-1) # Black
+    
+    pixels = rgb[mask].astype(np.int32)
+    if not len(pixels):
+        return '#000000'
+    
+    buckets = (pixels[:, 0] >> 4) << 8 | (pixels[:, 1] >> 4) << 4 | (pixels[:, 2] >> 4)
+    top = np.bincount(buckets, minlength=4096).argmax()
+    dominant = pixels[buckets == top].mean(axis=0).round().astype(int)
+    
+    return '#{:02x}{:02x}{:02x}'.format(*dominant).upper()
 
 def load_existing_source(source_file, default_name, default_identifier):
     if os.path.exists(source_file):
@@ -179,166 +201,205 @@ def load_existing_source(source_file, default_name, default_identifier):
         "news": []
     }
 
-def select_best_ipa(assets, app_config):
-    """Select the most appropriate IPA asset based on config and heuristics."""
-    ipa_assets = [a for a in assets if a.get('name', '').lower().endswith('.ipa')]
-    if not ipa_assets:
-        return None
+# Identifying tokens that appear in IPA filenames but aren't flavors
+IPA_IGNORE_TOKENS = frozenset({'ipa', 'ios', 'app', 'v', 'ver', 'version', 'release', 'nightly', 'beta', 'alpha', 'dev', 'debug', 'stable', 'latest', 'build'})
+
+AppNameContext = namedtuple('AppNameContext', ['norm_name', 'known_tokens'])
+
+def tokenize(s):
+    """Split a string into its set of lowercase alphanumeric tokens."""
+    return set(filter(None, NON_ALNUM_PATTERN.split(s.lower())))
+
+@functools.lru_cache(maxsize=256)
+def app_name_context(name, repo):
+    """
+    Per-app values select_best_ipa compares every asset against.
+    Repo tokens are included to allow matches like "UTM" matching "utmapp/UTM".
+    """
+    return AppNameContext(normalize_name(name), frozenset(tokenize(name) | tokenize(repo) | IPA_IGNORE_TOKENS))
+
+def score_ipa_asset(asset_name, norm_app_name, known_tokens):
+    """Score how well an IPA filename matches the app. Flavor mismatches are massively penalized."""
+    asset_tokens = tokenize(asset_name)
+    
+    # Calculate "Surprise" tokens: present in Asset but NOT in App Name/Repo/Ignore list
+    # We want to know if the asset has EXTRA meaning that was not requested
+    
+    # We filter out numbers (versions) from surprise
+    surprise_tokens = []
+    for t in asset_tokens:
+        if t in known_tokens:
+            continue
+        if t.isdigit(): # version number?
+             continue
+        if t.startswith('v') and t[1:].isdigit(): # v1, v2 etc
+             continue
+        # short tokens might be noise
+        if len(t) < 2: 
+             continue
+        surprise_tokens.append(t)
+    
+    # Scoring
+    score = 0
+    
+    # Exact Match Bonus
+    norm_asset = normalize_name(os.path.splitext(asset_name)[0])
+    if norm_asset == norm_app_name:
+        score += 100
         
-    if len(ipa_assets) == 1:
-        return ipa_assets[0]
+    # Subset Bonus
+    if norm_app_name in norm_asset:
+        score += 50
+    if norm_asset in norm_app_name: # rare but good
+        score += 20
         
+    # Surprise Penalty (The Core Fix)
+    if surprise_tokens:
+        # If there are surprise tokens, it's likely a different flavor
+        # e.g. App="UTM", Asset="UTM-HV" -> Surprise="hv" -> Penalty
+        logger.debug(f"Asset {asset_name} has surprise tokens: {surprise_tokens}")
+        score -= 1000 # Massive penalty to prevent selection
+    else:
+        # Clean match bonus
+        score += 30
+    
+    return score
+
+def select_best_ipa(assets, app_config):
+    """Select the most appropriate IPA asset based on config and heuristics."""
     # 1. Regex Match (User Override)
+    pattern = None
     ipa_regex = app_config.get('ipa_regex')
     if ipa_regex:
         try:
-            pattern = re.compile(ipa_regex, re.IGNORECASE)
-            for a in ipa_assets:
-                if pattern.search(a['name']):
-                    return a
+            pattern = compile_user_regex(ipa_regex)
         except Exception as e:
             logger.error(f"Invalid ipa_regex '{ipa_regex}': {e}")
 
     # 2. Dynamic Token Comparison (Smart Matching)
     # Goal: Ensure file doesn't contain "flavor" tokens (like "-HV") that are NOT in the App Name.
-    norm_app_name = normalize_name(app_config['name'])
-    
-    # helper to tokenize
-    def tokenize(s):
-        # Split by non-alphanumeric chars
-        tokens = set(filter(None, re.split(r'[^a-z0-9]', s.lower())))
-        return tokens
-
-    app_tokens = tokenize(app_config['name'])
-    # Add repo name parts to allow matches like "UTM" matching "utmapp/UTM"
-    repo_tokens = tokenize(app_config['github_repo'])
-    
-    # Ignore identifying tokens that appear in filenames but aren't flavors
-    ignore_tokens = {'ipa', 'ios', 'app', 'v', 'ver', 'version', 'release', 'nightly', 'beta', 'alpha', 'dev', 'debug', 'stable', 'latest', 'build'}
-    # Also ignore purely numeric tokens (version numbers)
+    norm_app_name, known_tokens = app_name_context(app_config['name'], app_config['github_repo'])
     
+    # Single pass over the assets, ranking each IPA by (regex hit, rank, -position):
+    # regex hits rank by position (first match wins), the rest by heuristic score (earlier wins ties)
     scored_assets = []
     
-    for a in ipa_assets:
+    for i, a in enumerate(assets):
+        asset_name = a.get('name', '')
+        if not asset_name.lower().endswith('.ipa'):
+            continue
+        
+        if pattern and pattern.search(asset_name):
+            scored_assets.append(((True, -i, -i), a))
+            continue
+        
         try:
-            asset_tokens = tokenize(a['name'])
-            
-            # Calculate "Surprise" tokens: present in Asset but NOT in App Name/Repo/Ignore list
-            # We want to know if the asset has EXTRA meaning that was not requested
-            
-            # We filter out numbers (versions) from surprise
-            surprise_tokens = []
-            for t in asset_tokens:
-                if t in app_tokens or t in repo_tokens or t in ignore_tokens:
-                    continue
-                if t.isdigit(): # version number?
-                     continue
-                if t.startswith('v') and t[1:].isdigit(): # v1, v2 etc
-                     continue
-                # short tokens might be noise
-                if len(t) < 2: 
-                     continue
-                surprise_tokens.append(t)
-            
-            # Scoring
-            score = 0
-            
-            # Exact Match Bonus
-            norm_asset = normalize_name(os.path.splitext(a['name'])[0])
-            if norm_asset == norm_app_name:
-                score += 100
-                
-            # Subset Bonus
-            if norm_app_name in norm_asset:
-                score += 50
-            if norm_asset in norm_app_name: # rare but good
-                score += 20
-                
-            # Surprise Penalty (The Core Fix)
-            if surprise_tokens:
-                # If there are surprise tokens, it's likely a different flavor
-                # e.g. App="UTM", Asset="UTM-HV" -> Surprise="hv" -> Penalty
-                logger.debug(f"Asset {a['name']} has surprise tokens: {surprise_tokens}")
-                score -= 1000 # Massive penalty to prevent selection
-            else:
-                # Clean match bonus
-                score += 30
-            
-            scored_assets.append((score, a))
-            
+            score = score_ipa_asset(asset_name, norm_app_name, known_tokens)
         except Exception as e:
-            logger.warning(f"Error scoring asset {a['name']}: {e}")
-            scored_assets.append((-999, a))
+            logger.warning(f"Error scoring asset {asset_name}: {e}")
+            score = -999
+        scored_assets.append(((False, score, -i), a))
 
-    if scored_assets:
-        scored_assets.sort(key=lambda x: x[0], reverse=True)
-        best_score, best_asset = scored_assets[0]
-        
-        # Only select if score is reasonable (not massively penalized)
-        # We use -500 as threshold to allow for some minor mismatches but block flavor mismatches
-        if best_score > -500: 
-            return best_asset
+    if not scored_assets:
+        return None
+    
+    if len(scored_assets) == 1:
+        return scored_assets[0][1]
+    
+    (regex_hit, best_score, _), best_asset = max(scored_assets, key=lambda x: x[0])
+    
+    # Only select if score is reasonable (not massively penalized)
+    # We use -500 as threshold to allow for some minor mismatches but block flavor mismatches
+    if regex_hit or best_score > -500: 
+        return best_asset
         
     logger.warning(f"No suitable IPA found for {app_config['name']} (Strict matching rejected aliases)")
     return None
 
-    # Fallback removed - we do NOT want to return a random first file if it mismatched
-    # return ipa_assets[0]
-
-def get_image_quality(image_url, client):
+def image_quality_of(img):
     """
     Analyzes image quality and returns a score and its properties.
     Score factors: squareness, lack of transparency, resolution.
     """
+    width, height = img.size
+    
+    # 1. Squareness
+    aspect_ratio = width / height
+    is_square = 0.95 <= aspect_ratio <= 1.05
+    
+    # 2. Transparency check
+    has_transparency = False
+    # Opaque modes never touch pixel data: size and mode come from the header alone
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        # Check if there's actually any transparent pixel
+        # Only the alpha band is needed; palette images still need an RGBA conversion
+        alpha = img.getchannel('A') if img.mode != 'P' else img.convert("RGBA").getchannel('A')
+        # Sample some pixels or check the whole alpha channel
+        # For performance, we check the corners which are most likely to be transparent in a rounded icon
+        corners = [
+            (0, 0), (width-1, 0), (0, height-1), (width-1, height-1),
+            (width//2, 0), (0, height//2), (width-1, height//2), (width//2, height-1)
+        ]
+        for x, y in corners:
+            if alpha.getpixel((x, y)) < 250:
+                has_transparency = True
+                break
+    
+    # Calculate quality score
+    quality = 0
+    if is_square: quality += 50
+    if not has_transparency: quality += 50
+    
+    # Resolution bonus (up to 100 points)
+    # 1024x1024 is the gold standard for App Store icons
+    res_score = min(100, (width * height) / (1024 * 1024) * 100)
+    quality += res_score
+    
+    # Opaque square bonus (Gold standard)
+    if is_square and not has_transparency:
+        quality += 50
+        if width >= 512: quality += 50
+    
+    return quality, is_square, has_transparency
+
+@functools.lru_cache(maxsize=64)
+def fetch_icon_bytes(image_url, client):
+    """Download an icon once per run; it may be scored, compared and tinted."""
+    response = client.get(image_url, timeout=10)
+    return response.content if response else None
+
+@functools.lru_cache(maxsize=256)
+def get_icon_meta(image_url, client):
+    """
+    Analyze an icon, returning its IconMeta. Cached per URL.
+    Image.open only parses the header, so opaque icons are never fully decoded.
+    """
     if not image_url or not image_url.startswith(('http://', 'https://')):
-        return 0, False, False
+        return EMPTY_ICON_META
     
     try:
-        response = client.get(image_url, timeout=10)
-        if not response: return 0, False, False
-        
-        img = Image.open(BytesIO(response.content))
-        width, height = img.size
-        
-        # 1. Squareness
-        aspect_ratio = width / height
-        is_square = 0.95 <= aspect_ratio <= 1.05
-        
-        # 2. Transparency check
-        has_transparency = False
-        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-            # Check if there's actually any transparent pixel
-            img_rgba = img.convert("RGBA")
-            # Sample some pixels or check the whole alpha channel
-            # For performance, we check the corners which are most likely to be transparent in a rounded icon
-            corners = [
-                (0, 0), (width-1, 0), (0, height-1), (width-1, height-1),
-                (width//2, 0), (0, height//2), (width-1, height//2), (width//2, height-1)
-            ]
-            for x, y in corners:
-                if img_rgba.getpixel((x, y))[3] < 250:
-                    has_transparency = True
-                    break
-        
-        # Calculate quality score
-        quality = 0
-        if is_square: quality += 50
-        if not has_transparency: quality += 50
-        
-        # Resolution bonus (up to 100 points)
-        # 1024x1024 is the gold standard for App Store icons
-        res_score = min(100, (width * height) / (1024 * 1024) * 100)
-        quality += res_score
-        
-        # Opaque square bonus (Gold standard)
-        if is_square and not has_transparency:
-            quality += 50
-            if width >= 512: quality += 50
+        content = fetch_icon_bytes(image_url, client)
+        if not content: return EMPTY_ICON_META
         
-        return quality, is_square, has_transparency
+        return IconMeta(*image_quality_of(Image.open(BytesIO(content))))
     except Exception as e:
         logger.warning(f"Could not analyze image {image_url}: {e}")
-        return 0, False, False
+        return EMPTY_ICON_META
+
+@functools.lru_cache(maxsize=64)
+def get_icon_color(image_url, client):
+    """Dominant color of an icon; only decoded for the icon actually used for the tint."""
+    if not image_url or not image_url.startswith(('http://', 'https://')):
+        return None
+    
+    try:
+        content = fetch_icon_bytes(image_url, client)
+        if not content: return None
+        
+        return dominant_color_of(Image.open(BytesIO(content)))
+    except Exception as e:
+        logger.warning(f"Could not extract color from {image_url}: {e}")
+        return None
 
 def apply_bundle_id_suffix(bundle_id, app_name, repo_name):
     """Apply unique suffixes to bundle identifier based on app name/flavor automatically."""
@@ -349,22 +410,22 @@ def apply_bundle_id_suffix(bundle_id, app_name, repo_name):
     
     # Use a simple clean comparison to see if they are effectively the same name
     # (e.g., "Pica Comic" vs "PicaComic")
-    def simple_clean(s): return re.sub(r'[^a-z0-9]', '', s.lower())
+    def simple_clean(s): return NON_ALNUM_PATTERN.sub('', s.lower())
     
     if simple_clean(app_name) == simple_clean(repo_name_clean):
         return bundle_id
 
     # Extract words from both to find the "flavor"
-    name_words = re.findall(r'[a-z0-9]{2,}', name_lower)
-    repo_words = set(re.findall(r'[a-z0-9]{2,}', repo_name_clean))
+    name_words = WORD_PATTERN.findall(name_lower)
+    repo_words = set(WORD_PATTERN.findall(repo_name_clean))
     
     # Keywords are words in app name but not in repo name
     keywords = [w for w in name_words if w not in repo_words]
     
     # Also specifically check inside parentheses
-    tags_in_brackets = re.findall(r'\((.*?)\)', name_lower)
+    tags_in_brackets = BRACKET_TAG_PATTERN.findall(name_lower)
     for tag in tags_in_brackets:
-        tag_clean = re.sub(r'[^a-z0-9]', '', tag.lower())
+        tag_clean = NON_ALNUM_PATTERN.sub('', tag.lower())
         if tag_clean and len(tag_clean) >= 2 and tag_clean not in keywords:
             keywords.append(tag_clean)
 
@@ -373,12 +434,84 @@ def apply_bundle_id_suffix(bundle_id, app_name, repo_name):
     
     new_bundle_id = bundle_id
     for kw in keywords:
-        # Avoid adding if already there
-        if not re.search(rf'\.{kw}(\.|$)', new_bundle_id):
+        # Avoid adding if already there (as a whole dot-separated component)
+        if f".{kw}." not in f"{new_bundle_id}.":
             new_bundle_id = f"{new_bundle_id}.{kw}"
             
     return new_bundle_id
 
+def refresh_icon_and_tint(app_entry, app_config, client):
+    """
+    Pick the best icon (config > better repo candidate > current) and fill in the tint color.
+    Returns the auto-detected icon URL if one was chosen, else None.
+    """
+    name = app_config['name']
+    repo = app_config['github_repo']
+    found_icon_auto = None
+    
+    config_icon = app_config.get('icon_url')
+    current_icon = app_entry.get('iconURL')
+    
+    # Fast path: If config has icon, use it and skip scraping
+    if config_icon and config_icon not in ['None', '_No response_']:
+        app_entry['iconURL'] = config_icon
+    else:
+        # Only scrape if we don't have a good icon yet or want to check for better ones
+        repo_icons = find_best_icon(repo, client)
+        best_repo_score = -1
+        best_repo_icon = None
+        if repo_icons:
+            for cand in repo_icons:
+                q_score = get_icon_meta(cand, client).quality
+                path_score = score_icon_path(cand)
+                total_score = q_score + path_score
+                if total_score > best_repo_score:
+                    best_repo_score = total_score
+                    best_repo_icon = cand
+        
+        if best_repo_icon:
+            if not current_icon:
+                logger.info(f"Found icon for {name}: {best_repo_icon}")
+                app_entry['iconURL'] = best_repo_icon
+                found_icon_auto = best_repo_icon
+            else:
+                # Check if improvement
+                curr_q = get_icon_meta(current_icon, client).quality
+                curr_path = score_icon_path(current_icon)
+                curr_total = curr_q + curr_path
+                if best_repo_score > curr_total + 15: # Significant improvement
+                    logger.info(f"Replacing icon with better version from repo: {best_repo_icon}")
+                    app_entry['iconURL'] = best_repo_icon
+                    found_icon_auto = best_repo_icon
+    
+    config_tint = app_config.get('tint_color')
+    if config_tint:
+        app_entry['tintColor'] = config_tint
+    elif not app_entry.get('tintColor') or app_entry.get('tintColor') == '#000000':
+         extracted = get_icon_color(app_entry['iconURL'], client)
+         if extracted: app_entry['tintColor'] = extracted
+    
+    return found_icon_auto
+
+def apply_config_metadata(app_entry, app_config):
+    """Apply icon/tint overrides from apps.json to an entry that is otherwise up to date."""
+    name = app_config['name']
+    config_icon = app_config.get('icon_url')
+    if config_icon and config_icon not in ['None', '_No response_'] and app_entry.get('iconURL') != config_icon:
+        app_entry['iconURL'] = config_icon
+        logger.info(f"Updated icon for {name} from config")
+    
+    config_tint = app_config.get('tint_color')
+    if config_tint and app_entry.get('tintColor') != config_tint:
+        app_entry['tintColor'] = config_tint
+        logger.info(f"Updated tint color for {name} from config")
+
+def listed_ipas(app_entry):
+    """Set of (sha256, downloadURL) pairs for every version an entry already lists."""
+    if not app_entry:
+        return set()
+    return {(v.get('sha256'), v.get('downloadURL')) for v in app_entry.get('versions', [])}
+
 def process_app(app_config, current_app_entry, client):
     """
     Process a single app.
@@ -394,6 +527,8 @@ def process_app(app_config, current_app_entry, client):
     # Clone the entry if it exists to avoid side effects
     import copy
     app_entry = copy.deepcopy(current_app_entry) if current_app_entry else None
+    # Built once so the up-to-date checks below are O(1) regardless of version history length
+    known_ipas = listed_ipas(app_entry)
 
     found_icon_auto = None
     found_bundle_id_auto = None # Initialize variable
@@ -521,18 +656,8 @@ def process_app(app_config, current_app_entry, client):
         # BUT: don't skip if the version is generic (like "nightly"), because we want to 
         # extract the real version from the IPA.
         if is_up_to_date and (has_direct_link or not direct_url) and not is_generic:
-             metadata_updates = {}
              # Even if up to date, we might want to update some metadata from config
-             config_icon = app_config.get('icon_url')
-             if config_icon and config_icon not in ['None', '_No response_'] and app_entry.get('iconURL') != config_icon:
-                 app_entry['iconURL'] = config_icon
-                 logger.info(f"Updated icon for {name} from config")
-             
-             config_tint = app_config.get('tint_color')
-             if config_tint and app_entry.get('tintColor') != config_tint:
-                 app_entry['tintColor'] = config_tint
-                 logger.info(f"Updated tint color for {name} from config")
-             
+             apply_config_metadata(app_entry, app_config)
              logger.info(f"Skipping {name} (Already up to date at version {version})")
              return app_entry, {} # No metadata updates needed if skipping
 
@@ -544,57 +669,27 @@ def process_app(app_config, current_app_entry, client):
                 logger.info(f"Updated Bundle ID for {name}: {old_id} -> {new_id}")
                 app_entry['bundleIdentifier'] = new_id
 
-        config_icon = app_config.get('icon_url')
-        current_icon = app_entry.get('iconURL')
-        
-        # Fast path: If config has icon, use it and skip scraping
-        if config_icon and config_icon not in ['None', '_No response_']:
-            app_entry['iconURL'] = config_icon
-        else:
-            # Only scrape if we don't have a good icon yet or want to check for better ones
-            repo_icons = find_best_icon(repo, client)
-            best_repo_score = -1
-            best_repo_icon = None
-            if repo_icons:
-                for cand in repo_icons:
-                    q_score, _, _ = get_image_quality(cand, client)
-                    path_score = score_icon_path(cand)
-                    total_score = q_score + path_score
-                    if total_score > best_repo_score:
-                        best_repo_score = total_score
-                        best_repo_icon = cand
-            
-            if best_repo_icon:
-                if not current_icon:
-                    logger.info(f"Found icon for {name}: {best_repo_icon}")
-                    app_entry['iconURL'] = best_repo_icon
-                    found_icon_auto = best_repo_icon
-                else:
-                    # Check if improvement
-                    curr_q, _, _ = get_image_quality(current_icon, client)
-                    curr_path = score_icon_path(current_icon)
-                    curr_total = curr_q + curr_path
-                    if best_repo_score > curr_total + 15: # Significant improvement
-                        logger.info(f"Replacing icon with better version from repo: {best_repo_icon}")
-                        app_entry['iconURL'] = best_repo_icon
-                        found_icon_auto = best_repo_icon
-        
-        config_tint = app_config.get('tint_color')
-        if config_tint:
-            app_entry['tintColor'] = config_tint
-        elif not app_entry.get('tintColor') or app_entry.get('tintColor') == '#000000':
-             extracted = extract_dominant_color(app_entry['iconURL'], client)
-             if extracted: app_entry['tintColor'] = extracted
-        
         app_entry.pop('permissions', None)
 
     # 3. Download and process IPA for metadata
+    asset_etag = None
+    if not workflow_file and any(url == download_url for _, url in known_ipas):
+        # Preflight (only for a URL already listed, e.g. a re-uploaded generic tag):
+        # an asset whose ETag matches the one we hashed before is unchanged
+        asset_etag = client.get_asset_etag(download_url)
+        known_sha256 = client.known_asset_sha256(download_url, asset_etag)
+        if known_sha256 and (known_sha256, download_url) in known_ipas:
+            apply_config_metadata(app_entry, app_config)
+            logger.info(f"Skipping {name} (asset unchanged at {download_url})")
+            return app_entry, {}
+
     logger.info(f"Downloading IPA/Artifact for {name}...")
     fd, temp_path = tempfile.mkstemp(suffix='.ipa')
     os.close(fd)
     
     current_repo = client.get_current_repo()
     upload_success = False
+    downloaded_sha256 = None
 
     try:
         if workflow_file:
@@ -710,8 +805,14 @@ def process_app(app_config, current_app_entry, client):
             r = client.get(download_url, stream=True, timeout=300)
             if not r:
                 raise Exception(f"Failed to download from {download_url}")
+            # Hash while writing to avoid a second full read of the IPA
+            sha256_hash = hashlib.sha256()
             with open(temp_path, 'wb') as f:
-                f.write(r.content)
+                for chunk in r.iter_content(chunk_size=1 << 20):
+                    sha256_hash.update(chunk)
+                    f.write(chunk)
+            downloaded_sha256 = sha256_hash.hexdigest()
+            client.remember_asset(download_url, asset_etag, downloaded_sha256)
 
         default_bundle_id = f"com.placeholder.{name.lower().replace(' ', '')}"
         ipa_version, ipa_build, bundle_id = get_ipa_metadata(temp_path, default_bundle_id)
@@ -743,7 +844,7 @@ def process_app(app_config, current_app_entry, client):
             version = "0.0.0"
             bundle_id = default_bundle_id
             
-        sha256 = get_ipa_sha256(temp_path)
+        sha256 = downloaded_sha256 or get_ipa_sha256(temp_path)
         bundle_id = apply_bundle_id_suffix(bundle_id, name, repo)
 
     except Exception as e:
@@ -753,6 +854,16 @@ def process_app(app_config, current_app_entry, client):
     finally:
         if os.path.exists(temp_path): os.remove(temp_path)
     
+    # Generic tags (e.g. "nightly") can't be skipped by version; skip once the exact IPA is known
+    if (sha256, download_url) in known_ipas:
+        apply_config_metadata(app_entry, app_config)
+        logger.info(f"Skipping {name} (IPA unchanged at {download_url})")
+        return app_entry, {}
+
+    # Icon discovery is only worth it once a new build is confirmed
+    if app_entry:
+        found_icon_auto = refresh_icon_and_tint(app_entry, app_config, client)
+
     # 4. Finalize Entry
     repo_info = client.get_repo_info(repo) or {}
     main_desc = repo_info.get('description') or "No description available."
@@ -802,7 +913,7 @@ def process_app(app_config, current_app_entry, client):
                     best_cand = None
                     max_q = -1
                     for cand in icon_candidates:
-                        q_score, is_sq, has_trans = get_image_quality(cand, client)
+                        q_score = get_icon_meta(cand, client).quality
                         if q_score > max_q:
                             max_q = q_score
                             best_cand = cand
@@ -818,7 +929,7 @@ def process_app(app_config, current_app_entry, client):
         
         tint_color = app_config.get('tint_color')
         if not tint_color:
-             extracted = extract_dominant_color(icon_url, client)
+             extracted = get_icon_color(icon_url, client)
              tint_color = extracted if extracted else '#000000'
 
         app_entry = {
@@ -855,10 +966,10 @@ def update_repo(config_file, source_file, source_name, source_identifier, client
         return False
 
     apps = load_json(config_file)
-    # Create a snapshot to detect changes
-    import copy
-    original_apps = copy.deepcopy(apps)
+    # Set when auto-detected metadata is synced back into apps.json
+    apps_changed = False
     
+    import copy
     source_data = load_existing_source(source_file, source_name, source_identifier)
     # Create a snapshot of source data to detect changes
     original_source_data = copy.deepcopy(source_data)
@@ -877,8 +988,8 @@ def update_repo(config_file, source_file, source_name, source_identifier, client
     
     new_apps_list = []
     
-    # Use fewer workers to avoid hitting GitHub API rate limits too hard/fast.
-    MAX_WORKERS = 5
+    # One GraphQL round-trip for all release lists instead of one REST call per app
+    client.batch_fetch_releases([a['github_repo'] for a in apps if not a.get('github_workflow')])
     
     logger.info(f"Starting parallel update with {MAX_WORKERS} workers for {len(apps)} apps...")
     
@@ -893,10 +1004,11 @@ def update_repo(config_file, source_file, source_name, source_identifier, client
             current_entry = existing_apps_map.get(key)
             
             future = executor.submit(process_app, app_config, current_entry, client)
-            future_to_app[future] = name
+            future_to_app[future] = app_config
             
         for future in as_completed(future_to_app):
-            name = future_to_app[future]
+            target_config = future_to_app[future]
+            name = target_config['name']
             try:
                 resulting_entry, metadata_updates = future.result()
                 
@@ -904,19 +1016,18 @@ def update_repo(config_file, source_file, source_name, source_identifier, client
                     new_apps_list.append(resulting_entry)
                 
                 if metadata_updates:
-                    # Sync back to apps config (in-memory)
-                    # We need to find the specific app_config object in 'apps' list again
-                    target_config = next((x for x in apps if x['name'] == name), None)
-                    if target_config:
-                        for k, v in metadata_updates.items():
-                            if k == 'icon_url':
-                                if not target_config.get('icon_url'):
-                                    logger.info(f"Syncing found icon back to apps.json for {name}")
-                                    target_config['icon_url'] = v
-                            elif k == 'bundle_id':
-                                if not target_config.get('bundle_id'):
-                                    logger.info(f"Syncing found bundle_id back to apps.json for {name}")
-                                    target_config['bundle_id'] = v
+                    # Sync back to apps config (in-memory), on the exact object that was submitted
+                    for k, v in metadata_updates.items():
+                        if k == 'icon_url':
+                            if not target_config.get('icon_url'):
+                                logger.info(f"Syncing found icon back to apps.json for {name}")
+                                target_config['icon_url'] = v
+                                apps_changed = True
+                        elif k == 'bundle_id':
+                            if not target_config.get('bundle_id'):
+                                logger.info(f"Syncing found bundle_id back to apps.json for {name}")
+                                target_config['bundle_id'] = v
+                                apps_changed = True
 
             except Exception as exc:
                 logger.error(f"App {name} generated an exception: {exc}")
@@ -940,7 +1051,7 @@ def update_repo(config_file, source_file, source_name, source_identifier, client
                 })
 
     # Check if we need to save back changes to apps.json
-    if apps != original_apps:
+    if apps_changed:
         logger.info(f"Updating {config_file} with auto-detected metadata...")
         save_json(config_file, apps)
     
@@ -979,7 +1090,7 @@ def update_repo(config_file, source_file, source_name, source_identifier, client
     else:
         logger.info(f"No changes detected in {source_file}, skipping save.")
     
-    return has_changes or apps != original_apps
+    return has_changes or apps_changed
 
 def generate_combined_apps_md(source_file_standard, source_file_nsfw, output_file):
     """Generate a combined Markdown file listing all apps using local source.json data."""
@@ -990,8 +1101,10 @@ def generate_combined_apps_md(source_file_standard, source_file_nsfw, output_fil
             
         source_data = load_json(source_path)
         
-        f.write("| Icon | Name | Description | Source |\n")
-        f.write("| :---: | :--- | :--- | :--- |\n")
+        rows = [
+            "| Icon | Name | Description | Source |\n",
+            "| :---: | :--- | :--- | :--- |\n"
+        ]
         
         for app in source_data.get('apps', []):
             name = app.get('name', 'Unknown')
@@ -1004,13 +1117,17 @@ def generate_combined_apps_md(source_file_standard, source_file_nsfw, output_fil
             icon_md = f"<img src=\"{icon}\" width=\"48\" height=\"48\">" if icon else ""
             repo_link = f"[{repo}](https://github.com/{repo})" if repo else name
             
-            f.write(f"| {icon_md} | **{name}** | {description} | {repo_link} |\n")
+            rows.append(f"| {icon_md} | **{name}** | {description} | {repo_link} |\n")
+        
+        f.writelines(rows)
 
     dir_path = os.path.dirname(output_file) or '.'
     os.makedirs(dir_path, exist_ok=True)
 
+    tmp_path = None
     try:
-        with tempfile.NamedTemporaryFile('w', dir=dir_path, delete=False, encoding='utf-8') as tmp:
+        with tempfile.NamedTemporaryFile('w', buffering=1 << 18, dir=dir_path, delete=False, encoding='utf-8') as tmp:
+            tmp_path = tmp.name
             tmp.write("# Supported Apps\n\n")
             tmp.write(f"> *Last Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} (UTC)*\n\n")
             
@@ -1025,19 +1142,17 @@ def generate_combined_apps_md(source_file_standard, source_file_nsfw, output_fil
                 tmp.write("## NSFW Apps\n\n")
                 write_table_from_source(tmp, source_file_nsfw_json)
                 tmp.write("\n")
-            
-            tmp_path = tmp.name
         
         os.replace(tmp_path, output_file)
         logger.info(f"Generated {output_file}")
         
     except Exception as e:
         logger.error(f"Failed to generate {output_file}: {e}")
-        if 'tmp_path' in locals() and os.path.exists(tmp_path):
+        if tmp_path and os.path.exists(tmp_path):
             os.remove(tmp_path)
 
 def main():
-    client = GitHubClient()
+    client = GitHubClient.instance()
 
     # Update Standard Source
     changed_std = update_repo('sources/standard/apps.json', 'sources/standard/source.json', "Aiko3993's Sideload Source", "io.github.aiko3993.source", client)
@@ -1077,5 +1192,7 @@ def main():
         except Exception as e:
             logger.warning(f"Failed to run retention policy: {e}")
 
+    client.save_cache()
+
 if __name__ == "__main__":
     main()
@@ -1,13 +1,26 @@
+import atexit
 import json
 import os
 import sys
 import re
 import tempfile
 import logging
+import functools
+import heapq
+import threading
+import time
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,15 +32,60 @@ logger = logging.getLogger(__name__)
 # Constants
 REPO_PATTERN = re.compile(r'^[a-zA-Z0-9\._-]+/[a-zA-Z0-9\._-]+$')
 URL_PATTERN = re.compile(r'^https?://')
+LOCAL_URL_PATTERN = re.compile(r'localhost|127\.0\.0\.1|::1|0\.0\.0\.0|169\.254\.', re.IGNORECASE)
+# Placeholder values issue forms submit for an unset URL
+EMPTY_URL_VALUES = frozenset({'', 'none', '_no response_'})
+
+# Conditional request cache for GitHub API responses (ETag / 304 Not Modified)
+API_CACHE_PATH = os.path.join('.cache', 'github_api.json')
+# Persisted entries are always revalidated, so the TTL only bounds file growth; it must
+# comfortably exceed the hourly schedule or warm runs would start cold
+API_CACHE_TTL = 24 * 3600
+GRAPHQL_URL = "https://api.github.com/graphql"
+# Mirrors the REST /releases listing (30 newest by creation date) with only the fields we use
+GRAPHQL_RELEASE_FIELDS = """
+    releases(first: 30, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes {
+        tagName description publishedAt isDraft isPrerelease
+        releaseAssets(first: 100) { pageInfo { hasNextPage } nodes { name size downloadUrl } }
+      }
+    }"""
+
+# Icon discovery walks the tree this many levels deep in one GraphQL query; this covers
+# layouts like ios/Runner/Assets.xcassets/AppIcon.appiconset/Icon.png and one level more
+ICON_TREE_DEPTH = 6
+
+def _tree_entries_selection(depth):
+    selection = "path type"
+    for _ in range(depth - 1):
+        selection = f"path type object {{ ... on Tree {{ entries {{ {selection} }} }} }}"
+    return f"entries {{ {selection} }}"
+
+GRAPHQL_ICON_SNAPSHOT_QUERY = f"""
+query($owner: String!, $name: String!) {{
+  repository(owner: $owner, name: $name) {{
+    defaultBranchRef {{ name }}
+    owner {{ avatarUrl }}
+    object(expression: "HEAD:") {{ ... on Tree {{ {_tree_entries_selection(ICON_TREE_DEPTH)} }} }}
+  }}
+}}"""
+
+# Release asset ETags and the SHA-256 they hashed to, so unchanged IPAs aren't re-downloaded.
+# Entries are refreshed whenever a run matches them, so only assets no longer served expire.
+ASSET_CACHE_PATH = os.path.join('.cache', 'asset_etags.json')
+ASSET_CACHE_TTL = 7 * 24 * 3600
 
 def load_json(path):
     """Load JSON file safely."""
-    if not os.path.exists(path):
-        logger.warning(f"File not found: {path}")
-        return []
     try:
+        if orjson:
+            with open(path, 'rb') as f:
+                return orjson.loads(f.read())
         with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"File not found: {path}")
+        return []
     except json.JSONDecodeError as e:
         logger.error(f"Error decoding JSON {path}: {e}")
         sys.exit(1)
@@ -35,21 +93,33 @@ def load_json(path):
         logger.error(f"Error reading {path}: {e}")
         sys.exit(1)
 
+# Directories save_json has already created in this process
+_created_dirs = set()
+
 def save_json(path, data):
     """Save JSON file atomically."""
     dir_path = os.path.dirname(path) or '.'
-    os.makedirs(dir_path, exist_ok=True)
+    if dir_path not in _created_dirs:
+        os.makedirs(dir_path, exist_ok=True)
+        _created_dirs.add(dir_path)
     
+    tmp_path = None
     try:
-        with tempfile.NamedTemporaryFile('w', dir=dir_path, delete=False, encoding='utf-8') as tmp:
-            json.dump(data, tmp, indent=2, ensure_ascii=False)
-            tmp_path = tmp.name
+        if orjson:
+            # Same layout as json.dump(indent=2, ensure_ascii=False), written as UTF-8 bytes
+            with tempfile.NamedTemporaryFile('wb', dir=dir_path, delete=False) as tmp:
+                tmp_path = tmp.name
+                tmp.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with tempfile.NamedTemporaryFile('w', dir=dir_path, delete=False, encoding='utf-8') as tmp:
+                tmp_path = tmp.name
+                json.dump(data, tmp, indent=2, ensure_ascii=False)
         
         os.replace(tmp_path, path)
         logger.info(f"Saved {path}")
     except Exception as e:
         logger.error(f"Error saving {path}: {e}")
-        if 'tmp_path' in locals() and os.path.exists(tmp_path):
+        if tmp_path and os.path.exists(tmp_path):
             os.remove(tmp_path)
         sys.exit(1)
 
@@ -67,24 +137,39 @@ def validate_repo_format(repo):
 
 def validate_url(url):
     """Check if URL is valid and safe."""
-    if not url or url.lower() in ['none', '_no response_', '']:
+    if not url or url.casefold() in EMPTY_URL_VALUES:
         return True, "" # Empty is considered "valid" but ignored
     
     if not URL_PATTERN.match(url):
         return False, "Must start with http:// or https://"
     
     # Basic SSRF check
-    lower_url = url.lower()
-    if 'localhost' in lower_url or '127.0.0.1' in lower_url or '::1' in lower_url:
-        return False, "Localhost URLs not allowed"
+    if LOCAL_URL_PATTERN.search(url):
+        return False, "Localhost or link-local URLs not allowed"
         
     return True, ""
 
 class GitHubClient:
-    def __init__(self, token=None):
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """Process-wide client, so every entrypoint shares one session and its keep-alive pools."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                atexit.register(cls._instance.session.close)
+            return cls._instance
+
+    def __init__(self, token=None, pool_size=32):
         self.session = requests.Session()
         retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-        self.session.mount("https://", HTTPAdapter(max_retries=retries))
+        # One keep-alive pool per host (API, raw, release CDN, icon hosts, ...), each sized above
+        # the worker count so concurrent process_app calls reuse connections instead of re-handshaking
+        adapter = HTTPAdapter(max_retries=retries, pool_connections=32, pool_maxsize=pool_size, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.token = token or os.environ.get('GITHUB_TOKEN')
         self.headers = {
             "Accept": "application/vnd.github+json",
@@ -92,6 +177,97 @@ class GitHubClient:
         }
         if self.token:
             self.headers["Authorization"] = f"Bearer {self.token}"
+        self.session.headers.update(self.headers)
+
+        # url -> {'etag', 'last_modified', 'body', 'time'}; entries in _fresh were validated during this run
+        self._fresh = set()
+        self._cache_lock = threading.Lock()
+        now = time.time()
+        self._api_cache = {k: v for k, v in self._read_cache_file(API_CACHE_PATH).items()
+                           if now - v.get('time', 0) < API_CACHE_TTL}
+        # download url -> {'etag', 'sha256', 'time'}
+        self._asset_cache = {k: v for k, v in self._read_cache_file(ASSET_CACHE_PATH).items()
+                             if now - v.get('time', 0) < ASSET_CACHE_TTL}
+        # repo -> REST-shaped release list, filled by batch_fetch_releases
+        self._release_prefetch = {}
+        # repo -> bool, filled by check_repo_exists and successful get_repo_info calls
+        self._repo_exists = {}
+        # repo -> parsed /repos/{repo} response, shared by icon discovery and entry finalization
+        self._repo_info_cache = {}
+
+    @staticmethod
+    def _read_cache_file(path):
+        try:
+            if orjson:
+                with open(path, 'rb') as f:
+                    return orjson.loads(f.read())
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_cache_file(path, entries):
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if orjson:
+                with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(path), delete=False) as tmp:
+                    tmp_path = tmp.name
+                    tmp.write(orjson.dumps(entries))
+            else:
+                with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), delete=False, encoding='utf-8') as tmp:
+                    tmp_path = tmp.name
+                    json.dump(entries, tmp)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not save cache {path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def save_cache(self):
+        """Persist the API and asset caches so the next run can send conditional requests."""
+        with self._cache_lock:
+            api_entries = dict(self._api_cache)
+            asset_entries = dict(self._asset_cache)
+        self._write_cache_file(API_CACHE_PATH, api_entries)
+        self._write_cache_file(ASSET_CACHE_PATH, asset_entries)
+
+    def get_asset_etag(self, url):
+        """HEAD a download URL (following redirects) and return its ETag, if any."""
+        resp = self.head(url, allow_redirects=True, timeout=30)
+        if not resp or resp.status_code != 200:
+            return None
+        return resp.headers.get('ETag')
+
+    def known_asset_sha256(self, url, etag):
+        """Return the SHA-256 previously computed for this exact asset, or None."""
+        entry = self._asset_cache.get(url)
+        if etag and entry and entry.get('etag') == etag:
+            with self._cache_lock:
+                entry['time'] = time.time()
+            return entry.get('sha256')
+        return None
+
+    def remember_asset(self, url, etag, sha256):
+        if not etag:
+            return
+        with self._cache_lock:
+            self._asset_cache[url] = {'etag': etag, 'sha256': sha256, 'time': time.time()}
+
+    @staticmethod
+    def _cached_response(url, entry):
+        """Rebuild a 200 response from a cache entry."""
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp.encoding = 'utf-8'
+        resp._content = entry['body'].encode('utf-8')
+        if entry.get('etag'):
+            resp.headers['ETag'] = entry['etag']
+        if entry.get('last_modified'):
+            resp.headers['Last-Modified'] = entry['last_modified']
+        return resp
 
     def get_current_repo(self):
         """Get the current repository name (Owner/Repo)."""
@@ -112,15 +288,49 @@ class GitHubClient:
             pass
         return None
 
-    def get(self, url, params=None, **kwargs):
+    def get(self, url, params=None, cache=True, **kwargs):
         try:
-            headers = self.headers.copy()
-            # Don't send Authorization header to non-GitHub URLs
+            # Default headers live on the session; only per-request overrides are built here
+            headers = {}
+            # Don't send Authorization header to non-GitHub URLs (None drops the session value)
             if 'github.com' not in url and 'githubusercontent.com' not in url:
-                headers.pop('Authorization', None)
+                headers['Authorization'] = None
+
+            # Only JSON API calls are cached; downloads stream and are never revalidated,
+            # and callers pass cache=False for bodies too large to keep (e.g. recursive trees)
+            cache_key = None
+            if cache and url.startswith('https://api.github.com/') and not kwargs.get('stream'):
+                cache_key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+                entry = self._api_cache.get(cache_key)
+                if entry:
+                    if cache_key in self._fresh:
+                        return self._cached_response(url, entry)
+                    if entry.get('etag'):
+                        headers['If-None-Match'] = entry['etag']
+                    if entry.get('last_modified'):
+                        headers['If-Modified-Since'] = entry['last_modified']
             
             timeout = kwargs.pop('timeout', 30)
             resp = self.session.get(url, headers=headers, params=params, timeout=timeout, **kwargs)
+
+            if cache_key:
+                if resp.status_code == 304 and cache_key in self._api_cache:
+                    # Not Modified: does not count against the primary rate limit
+                    with self._cache_lock:
+                        entry = self._api_cache[cache_key]
+                        entry['time'] = time.time()
+                        self._fresh.add(cache_key)
+                    return self._cached_response(url, entry)
+                resp.raise_for_status()
+                etag = resp.headers.get('ETag')
+                last_modified = resp.headers.get('Last-Modified')
+                if (etag or last_modified) and resp.headers.get('Content-Type', '').startswith('application/json'):
+                    with self._cache_lock:
+                        self._api_cache[cache_key] = {'etag': etag, 'last_modified': last_modified,
+                                                      'body': resp.text, 'time': time.time()}
+                        self._fresh.add(cache_key)
+                return resp
+
             resp.raise_for_status()
             return resp
         except Exception as e:
@@ -129,10 +339,11 @@ class GitHubClient:
 
     def head(self, url, **kwargs):
         try:
-            headers = self.headers.copy()
-            # Don't send Authorization header to non-GitHub URLs
+            # Default headers live on the session; only per-request overrides are built here
+            headers = {}
+            # Don't send Authorization header to non-GitHub URLs (None drops the session value)
             if 'github.com' not in url and 'githubusercontent.com' not in url:
-                headers.pop('Authorization', None)
+                headers['Authorization'] = None
             
             timeout = kwargs.pop('timeout', 30)
             resp = self.session.head(url, headers=headers, timeout=timeout, **kwargs)
@@ -142,17 +353,120 @@ class GitHubClient:
             return None
 
     def get_repo_info(self, repo):
+        info = self._repo_info_cache.get(repo)
+        if info is not None:
+            return info
         url = f"https://api.github.com/repos/{repo}"
         resp = self.get(url)
-        return resp.json() if resp else None
+        if not resp: return None
+        info = resp.json()
+        self._repo_info_cache[repo] = info
+        self._repo_exists[repo] = True
+        return info
 
-    def get_latest_release(self, repo, prefer_pre_release=False, tag_regex=None):
-        url = f"https://api.github.com/repos/{repo}/releases"
-        resp = self.get(url)
-        if not resp:
+    def graphql(self, query, variables=None):
+        """Run a GraphQL query. Returns the 'data' object (possibly partial) or None."""
+        try:
+            resp = self.session.post(GRAPHQL_URL, headers=self.headers, json={'query': query, 'variables': variables or {}}, timeout=60)
+            resp.raise_for_status()
+            payload = orjson.loads(resp.content) if orjson else resp.json()
+        except Exception as e:
+            logger.error(f"GraphQL request failed: {e}")
             return None
+        for err in payload.get('errors') or []:
+            logger.warning(f"GraphQL error: {err.get('message')}")
+        return payload.get('data')
+
+    @staticmethod
+    def _rest_release(node):
+        """Convert a GraphQL release node to the REST field names used by callers."""
+        return {
+            'tag_name': node['tagName'],
+            'body': node.get('description'),
+            'published_at': node.get('publishedAt'),
+            'draft': node.get('isDraft', False),
+            'prerelease': node.get('isPrerelease', False),
+            'assets': [{'name': a['name'], 'size': a['size'], 'browser_download_url': a['downloadUrl']}
+                       for a in node['releaseAssets']['nodes']]
+        }
+
+    def batch_fetch_releases(self, repos, chunk_size=20):
+        """
+        Prefetch the release lists of many repos with one GraphQL query per chunk,
+        instead of one REST call per repo. get_latest_release serves these first;
+        repos missing from the response fall back to REST.
+        """
+        if not self.token:
+            return # GraphQL requires authentication
+        
+        repos = [r for r in dict.fromkeys(repos) if r not in self._release_prefetch and REPO_PATTERN.match(r)]
+        for start in range(0, len(repos), chunk_size):
+            chunk = repos[start:start + chunk_size]
+            params, selections, variables = [], [], {}
+            for i, repo in enumerate(chunk):
+                owner, name = repo.split('/', 1)
+                params.append(f"$o{i}: String!, $n{i}: String!")
+                selections.append(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{{GRAPHQL_RELEASE_FIELDS}\n  }}")
+                variables[f"o{i}"] = owner
+                variables[f"n{i}"] = name
+            query = f"query({', '.join(params)}) {{\n  " + "\n  ".join(selections) + "\n}"
+            
+            data = self.graphql(query, variables)
+            if not data:
+                continue
+            for i, repo in enumerate(chunk):
+                node = data.get(f"r{i}")
+                if not node:
+                    continue
+                releases = node['releases']['nodes']
+                # REST lists every asset; a release with more than one page of assets could be
+                # missing its IPA here, so leave that repo to the REST path
+                if any(r['releaseAssets']['pageInfo']['hasNextPage'] for r in releases):
+                    continue
+                self._release_prefetch[repo] = [self._rest_release(r) for r in releases]
+        
+        logger.info(f"Prefetched releases for {len(self._release_prefetch)} repos via GraphQL")
+
+    def get_icon_snapshot(self, repo):
+        """
+        Fetch what icon discovery needs (default branch, owner avatar, tree entries up to
+        ICON_TREE_DEPTH) in one GraphQL query, replacing the recursive tree + repo info REST calls.
+        Returns (tree_data, repo_info) shaped like the REST responses, or None to fall back to REST.
+        """
+        if not self.token or not REPO_PATTERN.match(repo):
+            return None
+        owner, name = repo.split('/', 1)
+        data = self.graphql(GRAPHQL_ICON_SNAPSHOT_QUERY, {'owner': owner, 'name': name})
+        node = (data or {}).get('repository')
+        if not node or not node.get('object') or not node.get('defaultBranchRef'):
+            return None
+
+        tree = []
+        truncated = False
+        pending = list(node['object'].get('entries') or [])
+        while pending:
+            entry = pending.pop()
+            tree.append({'path': entry['path'], 'type': entry['type']})
+            if entry['type'] == 'tree' and 'object' not in entry:
+                truncated = True # Directory at the depth limit, its contents were not fetched
+            pending.extend((entry.get('object') or {}).get('entries') or [])
+        tree.sort(key=lambda e: e['path']) # Same order as the REST tree, for stable tie-breaking
+
+        repo_info = {
+            'default_branch': node['defaultBranchRef']['name'],
+            'owner': {'avatar_url': node['owner']['avatarUrl']}
+        }
+        return {'tree': tree, 'truncated': truncated}, repo_info
+
+    def get_latest_release(self, repo, prefer_pre_release=False, tag_regex=None):
+        releases = self._release_prefetch.get(repo)
+        if releases is None:
+            url = f"https://api.github.com/repos/{repo}/releases"
+            resp = self.get(url)
+            if not resp:
+                return None
+            releases = resp.json()
         
-        releases = resp.json()
         if not isinstance(releases, list):
             return None
 
@@ -171,33 +485,39 @@ class GitHubClient:
         if not active_releases:
             return None
 
-        # Filter based on preference
-        stable = [r for r in active_releases if not r.get('prerelease', False)]
-        pre = [r for r in active_releases if r.get('prerelease', False)]
-
-        def get_date(r): return r.get('published_at') or ''
+        # Split by preference in one pass, reading each date once. GitHub timestamps are
+        # fixed-width UTC ISO8601 ('...Z'), so string order is chronological order.
+        stable, pre = [], []
+        for r in active_releases:
+            (pre if r.get('prerelease', False) else stable).append((r.get('published_at') or '', r))
 
+        # Only the newest of each kind is needed; max() keeps the first of equal dates like a stable sort
         if prefer_pre_release:
-            sorted_pre = sorted(pre, key=get_date, reverse=True)
-            sorted_stable = sorted(stable, key=get_date, reverse=True)
+            top_pre = max(pre, key=itemgetter(0), default=None)
+            top_stable = max(stable, key=itemgetter(0), default=None)
             
-            if sorted_pre:
-                if not sorted_stable or get_date(sorted_pre[0]) >= get_date(sorted_stable[0]):
-                    return sorted_pre[0]
+            if top_pre and (not top_stable or top_pre[0] >= top_stable[0]):
+                return top_pre[1]
             
-            return sorted_stable[0] if sorted_stable else (sorted_pre[0] if sorted_pre else None)
+            return top_stable[1] if top_stable else None
         else:
-            if stable:
-                return sorted(stable, key=get_date, reverse=True)[0]
-            return sorted(active_releases, key=get_date, reverse=True)[0]
+            return max(stable or pre, key=itemgetter(0))[1]
 
     def check_repo_exists(self, repo):
+        if repo in self._repo_exists:
+            return self._repo_exists[repo]
         url = f"https://api.github.com/repos/{repo}"
-        try:
-            response = self.session.head(url, headers=self.headers, timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+        if url in self._api_cache:
+            # Revalidate the cached repo info instead: a 304 confirms existence without rate-limit cost
+            exists = self.get_repo_info(repo) is not None
+        else:
+            try:
+                response = self.session.head(url, headers=self.headers, timeout=5)
+                exists = response.status_code == 200
+            except:
+                exists = False
+        self._repo_exists[repo] = exists
+        return exists
 
     def get_repo_contents(self, repo, path=""):
         """Fetch contents of a path in the repo."""
@@ -206,11 +526,16 @@ class GitHubClient:
         return resp.json() if resp else None
 
     def get_git_tree(self, repo, sha="HEAD", recursive=True):
-        """Fetch the git tree of the repo."""
+        """
+        Fetch the git tree of the repo.
+        Not kept in the API body cache: recursive monorepo trees run to megabytes, and the
+        persisted cache is loaded and rewritten on every run.
+        """
         recursive_param = "?recursive=1" if recursive else ""
         url = f"https://api.github.com/repos/{repo}/git/trees/{sha}{recursive_param}"
-        resp = self.get(url)
-        return resp.json() if resp else None
+        resp = self.get(url, cache=False)
+        if not resp: return None
+        return orjson.loads(resp.content) if orjson else resp.json()
 
     def get_latest_workflow_run(self, repo, workflow_file, branch=None):
         """Fetch the latest successful workflow run."""
@@ -439,49 +764,63 @@ def load_config():
 # Global config cache
 GLOBAL_CONFIG = load_config()
 
+# Icon scoring tables, built once at import instead of on every scored path.
+# Folder tiers are exclusive (first hit wins); filename keywords stack.
+ICON_FOLDER_SCORES = (
+    ('appicon.appiconset', 100),
+    ('ios/', 50),
+    ('assets/', 20),
+    ('public/', 10),
+)
+ICON_EXACT_NAME_SCORES = {'icon': 100, 'appicon': 150, 'marketing': 100}
+ICON_KEYWORD_SCORES = (
+    ('appicon', 100),
+    ('marketing', 80 + 45),
+    ('tinted', 70),
+    ('1024', 60),
+    ('production', 50),
+    ('icon', 50),
+    ('logo', 20),
+    ('rounded', 10),
+    ('square', 20),
+)
+ICON_EXCLUDE_PATTERNS = tuple(GLOBAL_CONFIG.get('icon_scoring', {}).get('exclude_patterns', []))
+
+ICON_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.svg')
+
 def score_icon_path(path):
     """Score a path or URL for its quality as an icon."""
-    p = path.lower()
+    return _score_lowered_icon_path(path.lower())
+
+def _score_lowered_icon_path(p):
+    """score_icon_path for an already lower-cased path."""
     score = 0
     
     # Critical folders/patterns
-    if 'appicon.appiconset' in p: score += 100
-    elif 'ios/' in p: score += 50
-    elif 'assets/' in p: score += 20
-    elif 'public/' in p: score += 10
-    
-    # Boost score for common icon names
-    icon_keywords = {
-        'appicon': 100,
-        'marketing': 80,
-        'tinted': 70,
-        '1024': 60,
-        'production': 50,
-        'icon': 50,  # Increased from 30
-        'logo': 20,
-        'rounded': 10
-    }
+    for folder, bonus in ICON_FOLDER_SCORES:
+        if folder in p:
+            score += bonus
+            break
     
-    filename = os.path.basename(p)
-    name_only = os.path.splitext(filename)[0].lower()
+    filename = p.rpartition('/')[2]
+    stem, dot, _ = filename.rpartition('.')
+    name_only = stem if dot else filename
     
     # Exact name bonuses
-    if name_only == 'icon': score += 100
-    if name_only == 'appicon': score += 150
-    if name_only == 'marketing': score += 100
+    score += ICON_EXACT_NAME_SCORES.get(name_only, 0)
     
-    for kw, bonus in icon_keywords.items():
+    # Boost score for common icon names
+    for kw, bonus in ICON_KEYWORD_SCORES:
         if kw in filename:
             score += bonus
-            
+    
     # Priority paths (like xcassets)
     if '.xcassets' in p:
         score += 50
     if '.appiconset' in p:
         score += 50
     
-    # Square/Resolution preference
-    if 'square' in filename: score += 20
+    # Resolution preference
     if '1024' in filename: score += 60
     elif '512' in filename: score += 40
     
@@ -489,27 +828,8 @@ def score_icon_path(path):
     if '@3x' in filename: score += 15
     elif '@2x' in filename: score += 10
     
-    if 'marketing' in filename: score += 45
-    
-    # Penalties from config
-    exclude_patterns = GLOBAL_CONFIG.get('icon_scoring', {}).get('exclude_patterns', [])
-    for pattern in exclude_patterns:
-        # Some checks were filename only, some were path. 
-        # To be safe and generic, we check if pattern is in filename OR path depending on context?
-        # Orig logic mixed them. 'android' in p; 'small' in filename.
-        # Let's standardize: if strict specific logic needed, keep it. 
-        # But for generic list: check checks filename mostly?
-        # 'android' in p is path check. 'watch' in p is path check.
-        # 'small' in filename.
-        
-        # Heuristic: if pattern is short/ambiguous, check filename. If distinct like 'android', check path.
-        # For simplicity in external config: check PATH for everything is stricter but safer?
-        # Or check both. 
-        # Original:
-        # if 'android' in p: score -= 60
-        # if 'small' in filename: score -= 20
-        
-        # Let's stick to checking PATH for robust exclusion.
+    # Penalties from config (checked against the whole path)
+    for pattern in ICON_EXCLUDE_PATTERNS:
         if pattern in p:
             score -= 30 # Generic penalty
             
@@ -519,57 +839,82 @@ def score_icon_path(path):
     
     return score
 
-def find_best_icon(repo, client, limit=20):
-    """
-    Auto-detect the best app icon candidates from the GitHub repository.
-    Returns a list of raw URLs sorted by score.
-    """
-    logger.info(f"Searching for icon candidates in {repo}...")
-    
-    # 1. Try fetching the full git tree (recursive)
+def _fetch_icon_tree_rest(repo, client):
+    """REST: full git tree (recursive) and repo info (default branch / avatar), fetched concurrently."""
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        tree_future = pool.submit(client.get_git_tree, repo, recursive=True)
+        info_future = pool.submit(client.get_repo_info, repo)
     try:
-        tree_data = client.get_git_tree(repo, recursive=True)
+        tree_data = tree_future.result()
     except Exception as e:
         logger.warning(f"Failed to fetch git tree for {repo}: {e}")
         tree_data = None
+    try:
+        repo_info = info_future.result()
+    except Exception as e:
+        logger.warning(f"Failed to fetch repo info for {repo}: {e}")
+        repo_info = None
+    return tree_data, repo_info
 
-    if not tree_data or 'tree' not in tree_data:
-        try:
-            root_contents = client.get_repo_contents(repo)
-            if root_contents and isinstance(root_contents, list):
-                tree_data = {'tree': [{'path': c['name'], 'type': 'blob' if c['type']=='file' else 'tree'} for c in root_contents]}
-            else:
-                return []
-        except:
-            return []
-
+def _score_icon_tree(tree_data):
+    """Return (score, path) for every positively scored image in the tree, in tree order."""
     candidates = []
-    valid_exts = ('.png', '.jpg', '.jpeg', '.webp', '.svg')
-    
     for item in tree_data['tree']:
         path = item['path']
-        if path.lower().endswith(valid_exts):
-            s = score_icon_path(path)
+        # Lower-case once for both the extension filter and scoring
+        p = path.lower()
+        if p.endswith(ICON_EXTENSIONS):
+            s = _score_lowered_icon_path(p)
             if s > 0:
                 candidates.append((s, path))
+    return candidates
+
+@functools.lru_cache(maxsize=256)
+def find_best_icon(repo, client, limit=20):
+    """
+    Auto-detect the best app icon candidates from the GitHub repository.
+    Returns a list of raw URLs sorted by score.
+    Cached per repo (including empty results): flavors of one repo share a single lookup per run.
+    """
+    logger.info(f"Searching for icon candidates in {repo}...")
+    
+    # 1. One GraphQL query for the tree, default branch and avatar (authenticated only)
+    snapshot = client.get_icon_snapshot(repo) if client.token else None
+    candidates = []
+    if snapshot:
+        tree_data, repo_info = snapshot
+        candidates = _score_icon_tree(tree_data)
+        # The snapshot stops at ICON_TREE_DEPTH; in monorepos the real AppIcon can sit deeper
+        # than a shallow logo, so only trust a truncated snapshot that already found an appiconset
+        if not candidates or (tree_data.get('truncated') and
+                              not any('.appiconset/' in path.lower() for _, path in candidates)):
+            logger.info(f"No app icon set in the first {ICON_TREE_DEPTH} levels of {repo}, fetching the full tree")
+            snapshot = None
+    
+    if not snapshot:
+        tree_data, repo_info = _fetch_icon_tree_rest(repo, client)
+        if not tree_data or 'tree' not in tree_data:
+            try:
+                root_contents = client.get_repo_contents(repo)
+                if root_contents and isinstance(root_contents, list):
+                    tree_data = {'tree': [{'path': c['name'], 'type': 'blob' if c['type']=='file' else 'tree'} for c in root_contents]}
+                else:
+                    return []
+            except:
+                return []
+        candidates = _score_icon_tree(tree_data)
     
     if not candidates:
-        try:
-            repo_info = client.get_repo_info(repo)
-            if repo_info and 'owner' in repo_info:
-                return [repo_info['owner']['avatar_url']]
-        except:
-            pass
+        if repo_info and 'owner' in repo_info:
+            return [repo_info['owner']['avatar_url']]
         return []
 
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    
-    repo_info = client.get_repo_info(repo)
     if not repo_info: return []
     default_branch = repo_info.get('default_branch', 'main')
     
+    # Only the top `limit` are used; nlargest keeps tree order among equal scores like a stable sort
     top_urls = []
-    for s, path in candidates[:limit]:
+    for s, path in heapq.nlargest(limit, candidates, key=lambda x: x[0]):
         raw_url = f"https://raw.githubusercontent.com/{repo}/{default_branch}/{path}"
         top_urls.append(raw_url)
         
@@ -1,8 +1,12 @@
 import sys
 import os
+import re
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from utils import load_json, save_json, validate_repo_format, validate_url, logger
 
+TINT_COLOR_PATTERN = re.compile(r'^#(?:[0-9a-fA-F]{3}|[0-9a-fA-F]{6})$')
+
 def fix_apps_json(file_path):
     """Sort and format apps.json."""
     logger.info(f"Fixing {file_path}...")
@@ -31,10 +35,11 @@ def fix_apps_json(file_path):
     logger.info(f"✅ Auto-fixed {file_path}")
     return True
 
-def validate_apps_json(file_path, global_seen_repos):
+def validate_apps_json(file_path, global_seen_repos, data=None):
     logger.info(f"Validating {file_path}...")
     
-    data = load_json(file_path)
+    if data is None:
+        data = load_json(file_path)
     if not isinstance(data, list):
         logger.error("Root must be a list")
         return False
@@ -55,8 +60,8 @@ def validate_apps_json(file_path, global_seen_repos):
             logger.error(f"Item {idx}: {msg} ('{repo}')")
             success = False
         else:
-            # Check for duplicate Repo + Name combination
-            repo_name_key = (repo.lower(), name.lower())
+            # Check for duplicate Repo + Name combination (one case-insensitive string key)
+            repo_name_key = f"{repo}\x00{name}".casefold()
             if repo_name_key in global_seen_repos:
                 logger.error(f"Item {idx}: Duplicate entry for repo '{repo}' with name '{name}'")
                 success = False
@@ -73,7 +78,7 @@ def validate_apps_json(file_path, global_seen_repos):
         # 4. Check Tint Color (Optional)
         tint = app.get('tint_color')
         if tint:
-            if not isinstance(tint, str) or not tint.startswith('#') or len(tint) not in [4, 7]:
+            if not isinstance(tint, str) or not TINT_COLOR_PATTERN.fullmatch(tint):
                 logger.error(f"Item {idx}: Invalid tint_color '{tint}'")
                 success = False
 
@@ -90,17 +95,25 @@ def main():
     global_seen_repos = set()
     all_valid = True
     
+    existing_files = []
     for file_path in files_to_check:
         if os.path.exists(file_path):
             if args.fix:
                 fix_apps_json(file_path)
-            
-            # Always validate after fixing (or if not fixing)
-            if not validate_apps_json(file_path, global_seen_repos):
-                all_valid = False
+            existing_files.append(file_path)
         else:
             logger.warning(f"File not found (skipping): {file_path}")
     
+    # Read the files concurrently, then validate serially in the listed order so
+    # duplicate detection across files stays deterministic without locking
+    with ThreadPoolExecutor() as executor:
+        loaded = list(executor.map(load_json, existing_files))
+    
+    # Always validate after fixing (or if not fixing)
+    for file_path, data in zip(existing_files, loaded):
+        if not validate_apps_json(file_path, global_seen_repos, data):
+            all_valid = False
+    
     if not all_valid:
         sys.exit(1)
 